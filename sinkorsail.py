@@ -3,11 +3,22 @@
 Copyright (c) 2014 Joshua Moore_
 """
 
+import argparse
+import json
+import multiprocessing
 import random
+import socket
+import socketserver
+import statistics
+import sys
+import threading
+import time
 from collections import deque
+from multiprocessing import shared_memory
 
 
-#Exception classes: _Error, OOBError, InputError, OverlapError
+#Exception classes: _Error, OOBError, InputError, OverlapError, StrategyError,
+#WorkerError
 class _Error(Exception):
     """Base class for exceptions in this module."""
     pass
@@ -25,11 +36,19 @@ class OverlapError(_Error):
     """Raised when Points overlap on a Board."""
 
 
-#Object classes: Board, Point, Ship, Player, AI
+class StrategyError(_Error):
+    """Raised when a simulated strategy stops making progress."""
+
+
+class WorkerError(_Error):
+    """Raised when simulation workers exit before their games are done."""
+
+
+#Object classes: Board, Point, Ship, Player, ScriptInput, AI
 class Board(object):
-    """A Board object is a 10x10 grid representing the game board.
+    """A Board object is a grid representing the game board.
 
-    Board width and height are set to 10.  References to these attributes
+    Board width and height default to 10.  References to these attributes
     are used throughout the module in lieu of the integer 10 to
     facilitate later forks using different size boards and fleet sizes.
     
@@ -39,13 +58,20 @@ class Board(object):
         height (integer)
         grid (nested list of strings)
         content (list of Ship objects)
+        rng (random.Random)
     """
     
-    def __init__(self, name="Board"):
-        """Initializes a Board object."""
+    def __init__(self, name="Board", width=10, height=10, rng=None):
+        """Initializes a Board object.
+
+        rng (random.Random) is used for random Points and Ships; a new
+        unseeded generator is used if it is None.  Boards wider than ten
+        columns can be simulated but not displayed.
+        """
         self.name = name
-        self.width = 10
-        self.height = 10
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else random.Random()
         self.grid = [["~" for x in range(self.width)]
                      for y in range(self.height)]
         self.content = [] #stores pointers to all Ship objects on board
@@ -155,9 +181,31 @@ class Board(object):
             s = Ship(self, point, direction, "battleship")
         return s
     
-    def rand_point(self):
-        """Initializes a Point at random coordinates on self."""
-        rdgen = random.Random()
+    def pack(self, buf=None):
+        """Writes self's fleet into buf as one byte per cell; returns buf.
+
+        Cells are in row order (index y * width + x).  A cell holds 0 if
+        it is empty, else 1 + the index in self.content of the Ship on
+        it.  buf may be any writable buffer of width * height bytes, ex.
+        a slice of shared memory; if it is None, a bytearray is made.
+        """
+
+        size = self.width * self.height
+        if buf is None:
+            buf = bytearray(size)
+        else:
+            buf[:size] = bytes(size)
+        for i, ship in enumerate(self.content):
+            for p in ship.ext:
+                buf[p.y * self.width + p.x] = i + 1
+        return buf
+
+    def rand_point(self, rng=None):
+        """Initializes a Point at random coordinates on self.
+
+        Coordinates are drawn from rng if given, else from self.rng.
+        """
+        rdgen = rng if rng is not None else self.rng
         x = rdgen.randrange(self.width)
         y = rdgen.randrange(self.height)
         return Point(self, x, y)
@@ -165,7 +213,7 @@ class Board(object):
     def rand_ship(self, order=0):
         """Initializes a Ship with a random starting point and direction."""
         point = self.rand_point()
-        direction = rand_direction()
+        direction = rand_direction(self.rng)
         s = self.place_ship(point, direction, order)
         return s
 
@@ -311,6 +359,12 @@ class Ship(object):
         symbol (string)
         kind(string)
     """
+
+    #Dictionary of Ship lengths by kind:
+    lengths = {
+        "battleship": 4, "cruiser": 3,
+        "destroyer": 2, "submarine": 1
+        }
     
     def __init__(self, board, point, direction="down", kind="submarine"):
         """Initializes a Ship object and appends it to board.content.
@@ -321,10 +375,7 @@ class Ship(object):
         if argument passed to kind is invalid."""
         self.board = board
         direct = {"down", "up", "left", "right"}
-        length = {
-            "battleship": 4, "cruiser": 3,
-            "destroyer": 2, "submarine": 1
-            }
+        length = Ship.lengths
         if (direction not in direct) or (kind not in length):
             raise InputError
         self.kind = kind
@@ -417,9 +468,17 @@ class Ship(object):
 
             
 class Player(object):
-    """An interface between the end-user and the user's game board."""
-    def __init__(self):
-        your_name = input("Enter your name: ")
+    """An interface between the end-user and the user's game board.
+
+    If source (a ScriptInput) is given, the player's name, fleet and
+    guesses are taken from it instead of being prompted for.
+    """
+    def __init__(self, source=None):
+        self.source = source
+        if source is None:
+            your_name = input("Enter your name: ")
+        else:
+            your_name = source.name
         self.board = Board(name=your_name)
         self.guesses = []
 
@@ -430,25 +489,16 @@ class Player(object):
         
         while True:
             response = input(prompt)
-            if len(response) < 2:
-                print("Invalid input.")
-                continue
-            x_string = response[0].upper()
-            y_string = response[1]
-            if (x_string.isalpha() and y_string.isnumeric() and
-                x_string in Point.row_keys):
-                x = Point.row_keys[x_string]
-                y = int(y_string)
-            else:
+            try:
+                point = parse_point(board, response)
+            except InputError:
                 print("Invalid input.")
                 continue
-            if (x >= board.width or y >= board.height) or (x < 0 or y < 0):
+            except OOBError:
                 print("Out of bounds.")
                 continue
-            point = Point(board, x, y)
             return point
 
-
     def input_direction(self):
         """Prompts the user to input a direction.
 
@@ -470,6 +520,12 @@ class Player(object):
         two cruisers, three destroyers, and four submarines.
         """
         
+        if self.source is not None:
+            for i, (x, y, direction) in enumerate(self.source.fleet):
+                point = Point(self.board, x, y)
+                self.board.place_ship(point, direction, order=i).display()
+            print(self.board)
+            return
         height = self.board.height
         width = self.board.width
         for i in range(10):
@@ -524,6 +580,13 @@ class Player(object):
                     
 
     def input_guess(self, ai):
+        if self.source is not None:
+            x, y = self.source.next_guess()
+            gs = Point(ai.board, x, y)
+            self.guesses.append(gs)
+            print("{} guesses {}".format(self.board.name, gs))
+            self.check_guess(gs)
+            return
         while True:
             gs = self.input_point(board=ai.board,
                                   prompt="Enter Guess (ex. A4)")
@@ -555,16 +618,127 @@ class Player(object):
         print(guess.board)
         print("{} missed opponent's fleet.".format(guess))
         return False
-        
+
+
+class ScriptInput(object):
+    """Supplies a Player's name, fleet and guesses from a file or stream.
+
+    The whole stream is read, parsed and validated when the object is
+    initialized, so a scripted game never waits on the terminal.  Blank
+    lines and lines beginning with "#" are ignored.  The first remaining
+    line may be "seed N", N an integer, to make the opposing AI repeat
+    the same game every time the script is played.  The next line is the
+    player's name, the next ten place the fleet in the order used by
+    Player.generate_fleet() (a point and a direction, ex. "A0 down";
+    submarines need only a point), and every line after that is a guess.
+
+    Instance attributes:
+        seed (integer, or None if the script does not give one)
+        name (string)
+        fleet (list of (x, y, direction) tuples)
+        guesses (deque of (x, y) tuples)
+    """
+
+    def __init__(self, stream):
+        """Reads stream and validates its contents.
+
+        Raises InputError, OOBError or OverlapError, naming the line at
+        fault, if the name, fleet or guesses are missing or invalid.
+        """
+
+        lines = []
+        for number, line in enumerate(stream.read().splitlines(), 1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                lines.append((number, line))
+        self.seed = None
+        if lines and lines[0][1].split()[0].lower() == "seed":
+            number, line = lines.pop(0)
+            fields = line.split()
+            try:
+                if len(fields) != 2:
+                    raise ValueError
+                self.seed = int(fields[1])
+            except ValueError:
+                raise InputError(
+                    "Line {}: expected seed and an integer.".format(number))
+        if len(lines) < 11:
+            raise InputError("Script needs a name and 10 ship placements.")
+        self.name = lines[0][1]
+        #The fleet is placed on a scratch Board so that overlapping and
+        #out of bounds Ships are caught before the game starts.
+        board = Board(name=self.name)
+        self.fleet = []
+        for order, (number, line) in enumerate(lines[1:11]):
+            fields = line.split()
+            if order < 6:
+                if len(fields) != 2:
+                    raise InputError(
+                        "Line {}: expected a point and a direction.".format(
+                            number))
+                direction = fields[1].lower()
+            else:
+                if len(fields) != 1:
+                    raise InputError(
+                        "Line {}: expected a point.".format(number))
+                direction = "down"
+            point = self._parse(board, fields[0], number)
+            try:
+                board.place_ship(point, direction, order)
+            except InputError:
+                raise InputError(
+                    "Line {}: invalid direction {}.".format(number, direction))
+            except OOBError:
+                raise OOBError(
+                    "Line {}: ship extends off the board.".format(number))
+            except OverlapError:
+                raise OverlapError(
+                    "Line {}: ship overlaps another ship.".format(number))
+            self.fleet.append((point.x, point.y, direction))
+        self.guesses = deque([])
+        for number, line in lines[11:]:
+            point = self._parse(board, line, number)
+            if (point.x, point.y) in self.guesses:
+                raise InputError(
+                    "Line {}: {} has already been guessed.".format(
+                        number, point))
+            self.guesses.append((point.x, point.y))
+
+    def _parse(self, board, text, number):
+        """Returns parse_point(board, text), naming line number on error."""
+        try:
+            return parse_point(board, text)
+        except InputError:
+            raise InputError("Line {}: invalid point {}.".format(number, text))
+        except OOBError:
+            raise OOBError("Line {}: {} is out of bounds.".format(number, text))
+
+    def next_guess(self):
+        """Removes and returns the next guess as an (x, y) tuple.
+
+        Raises InputError if the script has run out of guesses.
+        """
+
+        if not self.guesses:
+            raise InputError("Script ran out of guesses.")
+        return self.guesses.popleft()
+
 
 class AI(object):
     """Contains AI Ship placement and guess-related methods."""
-    def __init__(self, name="Opponent"):
+    def __init__(self, name="Opponent", width=10, height=10, rng=None,
+                 verbose=True):
         """An AI object has attributes for memory and decision making.
 
+        width and height size the AI's board.  rng (random.Random) drives
+        both fleet placement and guessing, so a seeded rng makes the AI
+        repeatable.  If verbose is False, nothing is printed.
+
         Instance attributes:
             name (string)
             board (Board)
+            rng (random.Random)
+            verbose (boolean)
             guesses (list of Points): Contains prohibited guesses; populated
                 by past guesses and the buffers of sunken Ships.
             combo (list of Points): Contains previous hits; cleared when a
@@ -578,24 +752,54 @@ class AI(object):
         """
         
         self.name = name
-        self.board = Board(self.name)
+        self.rng = rng if rng is not None else random.Random()
+        self.verbose = verbose
+        self.board = Board(self.name, width, height, self.rng)
         self.guesses = []
         self.combo = []
         self.adj_guide = deque([])
         self.guide = deque([])
           
-    def generate_fleet(self):
-        for i in range(10):
-            while True:
-                try:
-                    self.board.rand_ship(order=i)
-                except (OverlapError, OOBError):
-                    continue
-                break
+    def generate_fleet(self, fleet=None):
+        """Places Ships at random on self.board.
+
+        fleet is a sequence of Ship kinds; if it is None, the standard
+        ten Ship fleet is placed.  Ships already placed can leave no room
+        for the rest, so a Ship that fails 10 placements per cell of the
+        board makes the whole fleet start over.  Raises OverlapError if
+        the fleet still does not fit after 100 such restarts.
+        """
+
+        if fleet is None:
+            for i in range(10):
+                while True:
+                    try:
+                        self.board.rand_ship(order=i)
+                    except (OverlapError, OOBError):
+                        continue
+                    break
+            return
+        attempts = 10 * self.board.width * self.board.height
+        for restart in range(100):
+            del self.board.content[:]
+            for kind in fleet:
+                for attempt in range(attempts):
+                    point = self.board.rand_point()
+                    direction = rand_direction(self.rng)
+                    try:
+                        Ship(self.board, point, direction, kind)
+                    except (OverlapError, OOBError):
+                        continue
+                    break
+                else:
+                    break
+            else:
+                return
+        raise OverlapError("Fleet does not fit on the board.")
 
     def random_guess(self, player):
         while True:
-            gs = player.board.rand_point()
+            gs = player.board.rand_point(self.rng)
             if gs in self.guesses:
                 continue
             else:
@@ -613,15 +817,14 @@ class AI(object):
             # If an enemy ship has been hit.
             if (len(self.combo) == 1) and not self.adj_guide:
                 # If a list of adjacent points has not been generated, do so.
-                adj = self.combo[-1].adj_pts()
-                for p in adj:
-                    if p in self.guesses:
-                        adj.remove(p)
+                adj = [p for p in self.combo[-1].adj_pts()
+                       if p not in self.guesses]
                 self.adj_guide.extend(adj)
-                rg = random.Random()
-                n = rg.randrange(len(self.adj_guide))
-                self.adj_guide.rotate(n)
-            if len(self.combo) == 1:
+                if self.adj_guide:
+                    n = self.rng.randrange(len(self.adj_guide))
+                    self.adj_guide.rotate(n)
+            gs = None
+            if (len(self.combo) == 1) and self.adj_guide:
                 # Target a space adjacent to last hit.
                 gs = self.adj_guide.pop()
             elif len(self.combo) == 2:
@@ -633,10 +836,13 @@ class AI(object):
                     if p in self.guesses:
                         line.remove(p)
                 self.guide.extend(line)
-                gs = self.guide.popleft()
-            else:
-                # A catch-all in case there is a hole in the above logic.
-                print("Wait, what just happened in make_guess?")#debug info
+                if self.guide:
+                    gs = self.guide.popleft()
+            if gs is None:
+                # A catch-all in case there is a hole in the above logic,
+                # ex. every Point next to or in line with the hits has
+                # already been guessed.
+                gs = self.random_guess(player)
             self.guesses.append(gs)
             return gs
         else:
@@ -655,7 +861,8 @@ class AI(object):
         for ship in guess.board.content:
             if guess in ship.valid:
                 # If guess hits ship:
-                print("{} hit your {}!".format(guess, ship.kind))
+                if self.verbose:
+                    print("{} hit your {}!".format(guess, ship.kind))
                 guess.display("X")
                 ship.valid.remove(guess)
                 self.combo.append(guess)
@@ -663,36 +870,56 @@ class AI(object):
                     # If hit sinks ship, reset guess refinement attributes
                     # and append ship's all adjacent Points to self.guesses.
                     guess.board.content.remove(ship)
-                    print("Your {} has been sunk!".format(ship.kind))
+                    if self.verbose:
+                        print("Your {} has been sunk!".format(ship.kind))
                     for p in ship.buffer:
                         if p not in self.guesses:
                             self.guesses.append(p)
                     self.combo.clear()
                     self.guide.clear()
                     self.adj_guide.clear()
-                print(guess.board)
+                if self.verbose:
+                    print(guess.board)
                 return True
         # If guess misses enemy fleet:
         if len(self.guide) > 2:
             # Rotating the guide left after a miss switches the direction of
             # future guesses popped from guide.
             self.guide.rotate(-1)
-        print("{} missed your fleet.".format(guess))
         guess.display(" ")
-        print(guess.board)
+        if self.verbose:
+            print("{} missed your fleet.".format(guess))
+            print(guess.board)
         return False
 
     def guess(self, player):
         gs = self.make_guess(player)
-        print("{} guesses {}".format(self.name, gs))
+        if self.verbose:
+            print("{} guesses {}".format(self.name, gs))
         self.check_guess(gs)
 
 
 
-def rand_direction():
+def parse_point(board, text):
+    """Returns the Point on board named by text (ex. "A4" or "b10").
+
+    The column is a single letter and the row is every digit after it,
+    so multi-digit rows are read in full.  Raises InputError if text is
+    not of that form and OOBError if it names a Point off the board.
+    """
+
+    text = text.strip()
+    x_string = text[:1].upper()
+    y_string = text[1:]
+    if not (x_string in Point.row_keys and y_string.isdecimal()):
+        raise InputError(text)
+    return Point(board, Point.row_keys[x_string], int(y_string))
+
+
+def rand_direction(rng=None):
     """Randomly returns one of four cardinal direction as a string."""
     directions = ("down", "up", "right", "left")
-    rdgen = random.Random()
+    rdgen = rng if rng is not None else random.Random()
     num = rdgen.randrange(4)
     direction = directions[num]
     return direction
@@ -719,29 +946,816 @@ def main():
             break
 
         
-def play_loop():
-    ai = AI()
+def play_loop(source=None, seed=None):
+    """Plays one game against the AI.
+
+    If source (a ScriptInput) is given, the player's side of the game is
+    read from it and the "<Press Enter>" pauses are skipped.  The game
+    ends without a winner if the script runs out of guesses.  If seed is
+    given, or else if source gives one, the AI's fleet and guesses are
+    the same every time that seed is played.
+    """
+
+    if (seed is None) and (source is not None):
+        seed = source.seed
+    if seed is None:
+        ai = AI()
+    else:
+        ai = AI(rng=random.Random(seed))
     ai.generate_fleet()
-    player = Player()
+    player = Player(source)
     player.generate_fleet()
     iteration = 0
     while True:
         iteration += 1
         print("Round: ", iteration)
         print(ai.board)
+        if (source is not None) and not source.guesses:
+            print("Script ran out of guesses.\n")
+            break
         player.input_guess(ai)
-        input("<Press Enter>\n-------------")
+        if source is None:
+            input("<Press Enter>\n-------------")
         if len(ai.board.content) == 0:
             print("Winner!\n")
             break
         
         ai.guess(player)
-        input("<Press Enter>\n-------------")
+        if source is None:
+            input("<Press Enter>\n-------------")
         if len(player.board.content) == 0:
             print(player.board)
             print("You Lose.\n")
             break
 
 
+#Simulation: RandomAI, Tally, Comparison, Coordinator, SharedResults and
+#headless game functions
+class RandomAI(AI):
+    """An AI that ignores its hits and always guesses at random.
+
+    Serves as a baseline when comparing targeting strategies.
+    """
+
+    def make_guess(self, player):
+        gs = self.random_guess(player)
+        self.guesses.append(gs)
+        return gs
+
+
+#Targeting strategies available to simulations, by name.
+STRATEGIES = {"hunt": AI, "random": RandomAI}
+
+#The standard fleet, in the order Player.generate_fleet() places it.
+FLEET = (
+    "battleship", "cruiser", "cruiser", "destroyer", "destroyer",
+    "destroyer", "submarine", "submarine", "submarine", "submarine"
+    )
+
+
+class Tally(object):
+    """Aggregated results of simulated games between strategies A and B.
+
+    Tallies are small, can be merged in any order and convert to and
+    from plain dicts, so workers send one Tally per seed range rather
+    than one record per game.
+
+    Instance attributes:
+        games (integer)
+        wins (list of two integers): Games won by A and by B.  A moves
+            first, so A wins ties.
+        shots (list of two dicts): For A and for B, maps a number of
+            shots-to-win to the number of games that took that many.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.wins = [0, 0]
+        self.shots = [{}, {}]
+
+    def __repr__(self):
+        tally_string = "Games: {}\n".format(self.games)
+        for side, label in enumerate("AB"):
+            tally_string += "{} wins: {}  mean shots-to-win: {:.2f}\n".format(
+                label, self.wins[side], self.mean(side))
+        return tally_string
+
+    def add(self, shots_a, shots_b):
+        """Records one game in which A and B needed shots_a and shots_b."""
+        self.games += 1
+        if shots_a <= shots_b:
+            self.wins[0] += 1
+        else:
+            self.wins[1] += 1
+        for side, n in enumerate((shots_a, shots_b)):
+            self.shots[side][n] = self.shots[side].get(n, 0) + 1
+
+    def merge(self, other):
+        """Adds the games recorded in other to self; no return value."""
+        self.games += other.games
+        for side in range(2):
+            self.wins[side] += other.wins[side]
+            for n, count in other.shots[side].items():
+                self.shots[side][n] = self.shots[side].get(n, 0) + count
+
+    def mean(self, side=0):
+        """Returns the mean shots-to-win of side (0 for A, 1 for B)."""
+        if not self.games:
+            return 0.0
+        total = sum(n * count for n, count in self.shots[side].items())
+        return total / self.games
+
+    def as_dict(self):
+        """Returns self as a dict that can be encoded as JSON."""
+        return {"games": self.games, "wins": self.wins, "shots": self.shots}
+
+    @classmethod
+    def from_dict(cls, d):
+        """Returns a Tally made from a dict produced by as_dict()."""
+        tally = cls()
+        tally.games = d["games"]
+        tally.wins = list(d["wins"])
+        #JSON object keys are strings; shots-to-win are integers.
+        tally.shots = [{int(n): count for n, count in side.items()}
+                       for side in d["shots"]]
+        return tally
+
+
+class Comparison(object):
+    """Paired differences in shots-to-win between strategies A and B.
+
+    Each pair of shots-to-win comes from A and B firing at the same
+    fleet layout with identically seeded generators (common random
+    numbers), so luck of the layout cancels out of the difference and
+    far fewer games are needed than with independent games.  Running
+    statistics are kept with Welford's method.
+
+    Instance attributes:
+        games (integer)
+        differing (integer): Games in which shots_a != shots_b.
+        mean (float): Mean of shots_a - shots_b; negative if A is faster.
+        confidence (float): Confidence level of the interval, ex. 0.95.
+    """
+
+    def __init__(self, confidence=0.95):
+        self.games = 0
+        self.differing = 0
+        self.mean = 0.0
+        self.confidence = confidence
+        self._z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+        self._sum_squares = 0.0
+
+    def __repr__(self):
+        low, high = self.interval()
+        return ("Games: {}\nMean shots_a - shots_b: {:.3f}\n"
+                "{:.0%} interval: ({:.3f}, {:.3f})\n").format(
+                    self.games, self.mean, self.confidence, low, high)
+
+    def add(self, shots_a, shots_b):
+        """Records the shots-to-win of A and B on one fleet layout."""
+        self.games += 1
+        d = shots_a - shots_b
+        if d:
+            self.differing += 1
+        delta = d - self.mean
+        self.mean += delta / self.games
+        self._sum_squares += delta * (d - self.mean)
+
+    def stdev(self):
+        """Returns the sample standard deviation of the differences."""
+        if self.games < 2:
+            return float("inf")
+        return (self._sum_squares / (self.games - 1)) ** 0.5
+
+    def half_width(self):
+        """Returns the half-width of the confidence interval of self.mean.
+
+        Uses the normal approximation, which is sound once a few dozen
+        games have been recorded.  Returns infinity for fewer than two.
+        """
+
+        if self.games < 2:
+            return float("inf")
+        return self._z * self.stdev() / self.games ** 0.5
+
+    def interval(self):
+        """Returns the confidence interval of self.mean as a tuple."""
+        half = self.half_width()
+        return (self.mean - half, self.mean + half)
+
+
+class Coordinator(object):
+    """Hands out seed ranges to workers over TCP and merges their Tallies.
+
+    Workers (see run_worker()) connect to self.address and are sent one
+    range of seeds at a time, along with config, as a line of JSON.  A
+    worker replies with a line of JSON holding the Tally for that range,
+    sending a heartbeat line every timeout / 4 seconds until it is done.
+    If a worker disconnects, is silent for timeout seconds or replies
+    with a Tally of the wrong number of games, its range is handed to
+    the next worker that asks for one.
+
+    Instance attributes:
+        config (dict): Keyword arguments for simulate_game().
+        pending (deque of (start, stop) tuples): Unassigned seed ranges.
+        remaining (integer): Seed ranges not yet completed.
+        stopped (boolean): True once serving has stopped.
+        tally (Tally)
+        timeout (number)
+        address ((host, port) tuple)
+    """
+
+    def __init__(self, config, games, start=0, chunk=500,
+                 host="127.0.0.1", port=0, timeout=60):
+        """Initializes a Coordinator listening on (host, port).
+
+        The seeds start to start + games are split into ranges of at most
+        chunk seeds.  host may be a hostname or an IPv4 or IPv6 address;
+        if port is 0, a free port is chosen.  Raises InputError if games
+        is negative, chunk is less than 1, timeout is not positive or
+        config is invalid (see check_config()).
+        """
+
+        if games < 0:
+            raise InputError("The number of games cannot be negative.")
+        if chunk < 1:
+            raise InputError("Chunks must hold at least one seed.")
+        if timeout <= 0:
+            raise InputError("The timeout must be positive.")
+        check_config(config)
+        self.config = config
+        self.pending = deque([])
+        for lo in range(start, start + games, chunk):
+            self.pending.append((lo, min(lo + chunk, start + games)))
+        self.remaining = len(self.pending)
+        self.stopped = False
+        self.tally = Tally()
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        if ":" in host:
+            server_class = _ThreadingTCPServerV6
+        else:
+            server_class = socketserver.ThreadingTCPServer
+        self.server = server_class((host, port), _WorkerHandler)
+        self.server.daemon_threads = True
+        self.server.coordinator = self
+        self.address = self.server.server_address[:2]
+
+    def assign(self):
+        """Returns the next seed range to simulate.
+
+        Blocks while every unfinished range is assigned to a worker.
+        Returns None once all ranges are complete or serving has stopped.
+        """
+
+        with self.condition:
+            while not (self.pending or self.stopped) and self.remaining:
+                self.condition.wait()
+            if self.stopped or not self.remaining:
+                return None
+            return self.pending.popleft()
+
+    def requeue(self, seeds):
+        """Returns the seed range of a lost worker to self.pending."""
+        with self.condition:
+            self.pending.append(seeds)
+            self.condition.notify_all()
+
+    def complete(self, seeds, tally):
+        """Merges the tally of a finished seed range into self.tally."""
+        with self.condition:
+            self.tally.merge(tally)
+            self.remaining -= 1
+            self.condition.notify_all()
+
+    def run(self, alive=None):
+        """Serves workers until every seed range is complete.
+
+        If alive is given, it is called about once a second while ranges
+        remain; once it returns False, serving stops and WorkerError is
+        raised.  Returns self.tally.
+        """
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        with self.condition:
+            while self.remaining:
+                if alive is None:
+                    self.condition.wait()
+                elif not self.condition.wait(1) and not alive():
+                    break
+            self.stopped = True
+            self.condition.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+        if self.remaining:
+            raise WorkerError(
+                "Every worker exited with {} seed ranges unfinished.".format(
+                    self.remaining))
+        return self.tally
+
+
+class _ThreadingTCPServerV6(socketserver.ThreadingTCPServer):
+    """A ThreadingTCPServer that listens on an IPv6 address."""
+    address_family = socket.AF_INET6
+
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    """Serves seed ranges from a Coordinator to one connected worker."""
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        self.request.settimeout(coordinator.timeout)
+        while True:
+            seeds = coordinator.assign()
+            if seeds is None:
+                try:
+                    self._send({"done": True})
+                except OSError:
+                    pass
+                return
+            try:
+                self._send({"seeds": seeds, "config": coordinator.config,
+                            "heartbeat": coordinator.timeout / 4})
+                message = self._receive()
+                while "alive" in message:
+                    message = self._receive()
+                tally = Tally.from_dict(message)
+                if tally.games != seeds[1] - seeds[0]:
+                    raise ValueError("reply has the wrong number of games")
+            except (OSError, ValueError, KeyError, TypeError):
+                coordinator.requeue(seeds)
+                return
+            coordinator.complete(seeds, tally)
+
+    def _send(self, message):
+        self.wfile.write((json.dumps(message) + "\n").encode())
+
+    def _receive(self):
+        """Returns the next message from the worker as a dict."""
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("worker disconnected")
+        return json.loads(line.decode())
+
+
+class SharedResults(object):
+    """Fixed-layout game results in shared memory.
+
+    Worker processes attach by name and write each game's results in
+    place, so nothing is pickled per game and the parent reads the same
+    memory without copying.  Three blocks are kept, each exposed as a
+    flat memoryview:
+        layouts (bytes): games x 2 x (width * height); the packed Boards
+            of sides A and B for each game (see Board.pack()).
+        records (64-bit integers): games x 3; seed, shots_a and shots_b
+            for each game.
+        heatmaps (64-bit integers): workers x 2 x (width * height); the
+            guesses made at each cell by A and by B, one slot per worker
+            so that workers never write to the same count.
+
+    Instance attributes:
+        games (integer)
+        workers (integer)
+        width (integer)
+        height (integer)
+        layouts (memoryview)
+        records (memoryview)
+        heatmaps (memoryview)
+    """
+
+    def __init__(self, games, workers, width=10, height=10, names=None):
+        """Creates the shared blocks, or attaches to them if names is given.
+
+        names is the tuple returned by names() on the creating instance.
+        """
+
+        self.games = games
+        self.workers = workers
+        self.width = width
+        self.height = height
+        cells = width * height
+        sizes = (games * 2 * cells, games * 3 * 8, workers * 2 * cells * 8)
+        if names is None:
+            self._blocks = [shared_memory.SharedMemory(create=True,
+                                                       size=max(size, 1))
+                            for size in sizes]
+        else:
+            self._blocks = [shared_memory.SharedMemory(name)
+                            for name in names]
+        self.layouts = self._blocks[0].buf[:sizes[0]]
+        self.records = self._blocks[1].buf[:sizes[1]].cast("q")
+        self.heatmaps = self._blocks[2].buf[:sizes[2]].cast("q")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        self.unlink()
+
+    def names(self):
+        """Returns the names other processes attach to the blocks by."""
+        return tuple(block.name for block in self._blocks)
+
+    def layout(self, game, side):
+        """Returns a memoryview of the packed Board of side (0 or 1)."""
+        cells = self.width * self.height
+        offset = (2 * game + side) * cells
+        return self.layouts[offset:offset + cells]
+
+    def record(self, game):
+        """Returns (seed, shots_a, shots_b) for game."""
+        return tuple(self.records[3 * game:3 * game + 3])
+
+    def heatmap_view(self, worker, side):
+        """Returns a memoryview of one worker's heatmap for side (0 or 1)."""
+        cells = self.width * self.height
+        offset = (2 * worker + side) * cells
+        return self.heatmaps[offset:offset + cells]
+
+    def heatmap(self, side):
+        """Returns the heatmap of side (0 or 1) summed over all workers."""
+        cells = self.width * self.height
+        total = [0] * cells
+        for worker in range(self.workers):
+            view = self.heatmap_view(worker, side)
+            for i in range(cells):
+                total[i] += view[i]
+            view.release()
+        return total
+
+    def tally(self):
+        """Returns a Tally of every game record."""
+        tally = Tally()
+        for game in range(self.games):
+            tally.add(self.records[3 * game + 1], self.records[3 * game + 2])
+        return tally
+
+    def close(self):
+        """Detaches from the shared blocks; no return value.
+
+        Memoryviews taken from layout() and heatmap_view() must be
+        released first.
+        """
+
+        for view in (self.layouts, self.records, self.heatmaps):
+            view.release()
+        for block in self._blocks:
+            block.close()
+
+    def unlink(self):
+        """Frees the shared blocks; call once, from the creating process."""
+        for block in self._blocks:
+            block.unlink()
+
+
+def check_config(config):
+    """Raises InputError if config is not valid for simulate_game().
+
+    Checks the keys, board size, Ship kinds and strategies, then plays a
+    trial game so that a fleet that cannot fit on the board, or a
+    strategy that stalls, is reported before any worker starts.
+    """
+
+    unknown = set(config) - {"width", "height", "fleet", "strategies"}
+    if unknown:
+        raise InputError("Unknown config keys: {}.".format(
+            ", ".join(sorted(unknown))))
+    for key in ("width", "height"):
+        size = config.get(key, 10)
+        if not (isinstance(size, int) and size > 0):
+            raise InputError("Board {} must be a positive integer.".format(
+                key))
+    for kind in config.get("fleet", FLEET):
+        if kind not in Ship.lengths:
+            raise InputError("Unknown Ship kind: {}.".format(kind))
+    strategies = config.get("strategies", ("hunt", "hunt"))
+    if len(strategies) != 2:
+        raise InputError("Exactly two strategies are needed.")
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            raise InputError("Unknown strategy: {}.".format(strategy))
+    try:
+        simulate_game(0, **config)
+    except (OverlapError, StrategyError) as e:
+        raise InputError("Trial game failed: {}".format(e))
+
+
+def fleet_layout(seed, side, width=10, height=10, fleet=FLEET):
+    """Returns a silent AI whose board holds the fleet for seed and side.
+
+    The same seed and side always give the same layout.
+    """
+
+    target = AI(side, width, height, _seeded(seed, "fleet-" + side),
+                verbose=False)
+    target.generate_fleet(fleet)
+    return target
+
+
+def shots_to_win(strategy, target, rng, heatmap=None):
+    """Returns the number of guesses strategy needs to sink target's fleet.
+
+    strategy is a key of STRATEGIES, target an AI whose fleet has been
+    generated and rng the random.Random the strategy guesses with.
+    target's fleet is sunk in the process.  If heatmap (a sequence of
+    width * height counts in row order) is given, the count of every
+    cell guessed is incremented.  Raises StrategyError if the fleet is
+    still afloat after twice as many guesses as the board has cells.
+    """
+
+    width = target.board.width
+    limit = 2 * width * target.board.height
+    shooter = STRATEGIES[strategy](strategy, width, target.board.height,
+                                   rng, verbose=False)
+    shots = 0
+    while target.board.content:
+        gs = shooter.make_guess(target)
+        shooter.check_guess(gs)
+        shots += 1
+        if heatmap is not None:
+            heatmap[gs.y * width + gs.x] += 1
+        if shots > limit and target.board.content:
+            raise StrategyError(
+                "{} is stuck after {} shots".format(strategy, shots))
+    return shots
+
+
+def simulate_game(seed, width=10, height=10, fleet=FLEET,
+                  strategies=("hunt", "hunt"), layouts=None, heatmaps=None):
+    """Plays one headless game and returns (shots_a, shots_b).
+
+    Strategy A (strategies[0]) fires at side B's fleet and strategy B at
+    side A's.  Every layout and guess is drawn from generators seeded by
+    seed, so a game can be replayed from its seed alone.  If given,
+    layouts is a pair of buffers that sides A's and B's Boards are packed
+    into, and heatmaps a pair of heatmaps for A's and B's guesses (see
+    Board.pack() and shots_to_win()).
+    """
+
+    shots = []
+    for side, target_side in enumerate(("b", "a")):
+        target = fleet_layout(seed, target_side, width, height, fleet)
+        if layouts is not None:
+            target.board.pack(layouts[1 - side])
+        shots.append(shots_to_win(
+            strategies[side], target, _seeded(seed, "shots-" + "ab"[side]),
+            heatmaps[side] if heatmaps is not None else None))
+    return tuple(shots)
+
+
+def compare(strategies=("hunt", "random"), width=10, height=10,
+            fleet=FLEET, precision=0.5, confidence=0.95, min_games=30,
+            max_games=100000, start=0):
+    """Compares two strategies on paired games; returns a Comparison.
+
+    For each seed from start, both strategies fire at the same fleet
+    layout using generators seeded alike.  Stops once the confidence
+    interval of the mean difference in shots-to-win is no wider than
+    precision either side of the mean, or after max_games.  The interval
+    is only trusted once the strategies have differed in at least
+    min_games games and not always by the same amount; strategies that
+    rarely differ can otherwise show a run of identical results and an
+    interval of zero width.  Raises InputError if max_games is less than 1 or the
+    other arguments are invalid (see check_config()).
+    """
+
+    if max_games < 1:
+        raise InputError("At least one game is needed.")
+    check_config({"width": width, "height": height, "fleet": fleet,
+                  "strategies": strategies})
+    comparison = Comparison(confidence)
+    for seed in range(start, start + max_games):
+        shots = [shots_to_win(strategy,
+                              fleet_layout(seed, "b", width, height, fleet),
+                              _seeded(seed, "shots"))
+                 for strategy in strategies]
+        comparison.add(*shots)
+        if (comparison.differing >= min_games and
+            comparison.stdev() > 0 and
+            comparison.half_width() <= precision):
+            break
+    return comparison
+
+
+def run_worker(host, port, retries=5):
+    """Simulates seed ranges for the Coordinator at (host, port).
+
+    If the connection drops, ex. because the Coordinator gave up waiting,
+    the worker reconnects, giving up after retries failed attempts in a
+    row.  Returns when the Coordinator reports that every range is
+    complete or can no longer be reached.
+    """
+
+    failures = 0
+    while failures <= retries:
+        try:
+            with socket.create_connection((host, port)) as sock:
+                failures = 0
+                if _work(sock):
+                    return
+        except OSError:
+            failures += 1
+            time.sleep(1)
+
+
+def _work(sock):
+    """Simulates seed ranges sent over sock for run_worker().
+
+    Sends a heartbeat line as often as each task asks while simulating.
+    Returns True if the Coordinator reports that every range is complete
+    and False if the connection is closed first.
+    """
+
+    stream = sock.makefile("rw")
+    for line in stream:
+        task = json.loads(line)
+        if "seeds" not in task:
+            return True
+        heartbeat = time.monotonic() + task["heartbeat"]
+        tally = Tally()
+        for seed in range(*task["seeds"]):
+            tally.add(*simulate_game(seed, **task["config"]))
+            if time.monotonic() >= heartbeat:
+                stream.write(json.dumps({"alive": True}) + "\n")
+                stream.flush()
+                heartbeat = time.monotonic() + task["heartbeat"]
+        stream.write(json.dumps(tally.as_dict()) + "\n")
+        stream.flush()
+    return False
+
+
+def run_local(config, games, workers=4, start=0, chunk=500, timeout=60):
+    """Runs a Coordinator on loopback with workers local processes.
+
+    Returns the merged Tally.  Raises WorkerError if every worker process
+    exits before all seed ranges are complete.
+    """
+
+    coordinator = Coordinator(config, games, start, chunk, timeout=timeout)
+    processes = [multiprocessing.Process(target=run_worker,
+                                         args=coordinator.address)
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        tally = coordinator.run(
+            alive=lambda: any(process.is_alive() for process in processes))
+    finally:
+        for process in processes:
+            process.join()
+    return tally
+
+
+def run_shared(config, games, workers=4, start=0):
+    """Runs games in workers local processes over shared memory.
+
+    Each worker plays every workers-th seed from start and writes its
+    results straight into a new SharedResults, which is returned; the
+    caller must close() and unlink() it (or use it in a with statement).
+    Raises InputError if workers is less than 1, games is negative or
+    config is invalid (see check_config()), and WorkerError, after
+    freeing the shared blocks, if any worker fails.
+    """
+
+    if workers < 1:
+        raise InputError("At least one worker is needed.")
+    if games < 0:
+        raise InputError("The number of games cannot be negative.")
+    check_config(config)
+    shared = SharedResults(games, workers, config.get("width", 10),
+                           config.get("height", 10))
+    processes = [multiprocessing.Process(
+                     target=_shared_worker,
+                     args=(shared.names(), games, workers, config, i, start))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    failed = [process.exitcode for process in processes
+              if process.exitcode != 0]
+    if failed:
+        shared.close()
+        shared.unlink()
+        raise WorkerError("{} of {} workers failed (exit codes {}).".format(
+            len(failed), workers, failed))
+    return shared
+
+
+def _shared_worker(names, games, workers, config, index, start):
+    """Plays the games of worker index for run_shared()."""
+    shared = SharedResults(games, workers, config.get("width", 10),
+                           config.get("height", 10), names)
+    #Views must be released before shared.close(), even if a game raises.
+    try:
+        with shared.heatmap_view(index, 0) as heat_a, \
+             shared.heatmap_view(index, 1) as heat_b:
+            for game in range(index, games, workers):
+                with shared.layout(game, 0) as layout_a, \
+                     shared.layout(game, 1) as layout_b:
+                    shots = simulate_game(start + game,
+                                          layouts=(layout_a, layout_b),
+                                          heatmaps=(heat_a, heat_b),
+                                          **config)
+                shared.records[3 * game] = start + game
+                shared.records[3 * game + 1] = shots[0]
+                shared.records[3 * game + 2] = shots[1]
+    finally:
+        shared.close()
+
+
+def _seeded(seed, stream):
+    """Returns a random.Random for the named stream of a game seed."""
+    return random.Random("{}:{}".format(seed, stream))
+
+
+def _address(text):
+    """Returns a (host, port) tuple from a string of the form HOST:PORT.
+
+    An IPv6 host is written in brackets, ex. [::1]:5000.  Raises
+    InputError if the port is not a number.
+    """
+
+    host, _, port = text.rpartition(":")
+    if not port.isdecimal():
+        raise InputError("Invalid address: {}.".format(text))
+    return (host.strip("[]") or "127.0.0.1", int(port))
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Play SinkOrSail.")
+    parser.add_argument(
+        "script", nargs="?",
+        help="play the human side from a script file ('-' for stdin)")
+    parser.add_argument(
+        "--seed", type=int,
+        help="seed the AI of a scripted game (overrides a 'seed' line)")
+    parser.add_argument(
+        "--serve", metavar="HOST:PORT",
+        help="coordinate a simulation for workers connecting to HOST:PORT")
+    parser.add_argument(
+        "--work", metavar="HOST:PORT",
+        help="simulate games for the coordinator at HOST:PORT")
+    parser.add_argument(
+        "--local", type=int, metavar="N",
+        help="run a simulation with N local worker processes")
+    parser.add_argument(
+        "--shared", type=int, metavar="N",
+        help="run a simulation with N local processes over shared memory")
+    parser.add_argument(
+        "--compare", action="store_true",
+        help="compare strategies A and B on paired games, stopping once "
+             "the mean difference is known to within --precision shots")
+    parser.add_argument("--precision", type=float, default=0.5)
+    parser.add_argument("--games", type=int, default=10000,
+                        help="games to simulate (most games for --compare)")
+    parser.add_argument("--start", type=int, default=0, help="first seed")
+    parser.add_argument("--chunk", type=int, default=500,
+                        help="seeds handed to a worker at a time")
+    parser.add_argument("--timeout", type=float, default=60,
+                        help="seconds a worker may be silent before its "
+                             "seeds are handed to another worker")
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--height", type=int, default=10)
+    parser.add_argument("--fleet", default=",".join(FLEET),
+                        help="comma-separated Ship kinds")
+    parser.add_argument("--strategies", nargs=2, metavar=("A", "B"),
+                        default=["hunt", "hunt"], choices=sorted(STRATEGIES))
+    args = parser.parse_args()
+    config = {
+        "width": args.width, "height": args.height,
+        "fleet": args.fleet.split(","), "strategies": args.strategies
+        }
+    try:
+        if args.work is not None:
+            run_worker(*_address(args.work))
+        elif args.serve is not None:
+            host, port = _address(args.serve)
+            coordinator = Coordinator(config, args.games, args.start,
+                                      args.chunk, host, port, args.timeout)
+            print(coordinator.run())
+        elif args.compare:
+            print(compare(args.strategies, args.width, args.height,
+                          config["fleet"], args.precision,
+                          max_games=args.games, start=args.start))
+        elif args.shared is not None:
+            with run_shared(config, args.games, args.shared,
+                            args.start) as shared:
+                print(shared.tally())
+        elif args.local is not None:
+            print(run_local(config, args.games, args.local, args.start,
+                            args.chunk, args.timeout))
+        elif args.script is None:
+            main()
+        elif args.script == "-":
+            play_loop(ScriptInput(sys.stdin), args.seed)
+        else:
+            with open(args.script) as f:
+                play_loop(ScriptInput(f), args.seed)
+    except (_Error, OSError) as e:
+        print("{}: {}".format(args.script or parser.prog, e),
+              file=sys.stderr)
+        sys.exit(2)